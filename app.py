@@ -46,7 +46,7 @@ stripeEventbridgeStack = StripeEventbridgeStack(
     app,
     "StripeEventbridgeStack",
     config=config,
-    state_machine=eventStateMachineStack.state_machine,
+    subscription_events_queue=eventStateMachineStack.subscription_events_queue,
     env=cdk.Environment(
         account=os.getenv('AWS_ACCOUNT_ID'), 
         region=os.getenv('AWS_REGION')
@@ -2,7 +2,7 @@ from aws_cdk import (
     aws_ssm as ssm,
     aws_events as events,
     aws_iam as iam,
-    aws_stepfunctions as sfn,
+    aws_sqs as sqs,
     Stack,
 )
 from constructs import Construct
@@ -13,7 +13,7 @@ class StripeEventbridgeStack(Stack):
             scope: Construct, 
             id: str,
             config: dict,
-            state_machine: sfn.StateMachine, 
+            subscription_events_queue: sqs.IQueue, 
             **kwargs
         ) -> None:
         super().__init__(scope, id, **kwargs)
@@ -32,21 +32,6 @@ class StripeEventbridgeStack(Stack):
             simple_name=False
         ).string_value
 
-        # Create an IAM Role for EventBridge to Assume (if not using higher-level constructs)
-        eventbridge_role = iam.Role(
-            self,
-            "EventBridgeInvokeStepFunctionRole",
-            assumed_by=iam.ServicePrincipal("events.amazonaws.com"),
-        )
-
-        # Update the EventBridge Role Policy to allow starting the Step Function
-        eventbridge_role.add_to_policy(
-            iam.PolicyStatement(
-                actions=["states:StartExecution"],
-                resources=[state_machine.state_machine_arn],
-            )
-        )
-
         # Reference the Existing Event Bus
         stripe_event_bus = events.EventBus.from_event_bus_attributes(
             self, "StripeEventBus",
@@ -56,27 +41,54 @@ class StripeEventbridgeStack(Stack):
         )
 
         # Define the EventBridge Rule Using CfnRule with Specific Event Patterns
-        _ = events.CfnRule(
+        stripe_subs_events_rule = events.CfnRule(
             self,
             "StripeSubsEventsRule",
+            # The most selective key (detail-type) comes first. Events on a
+            # partner event bus carry the partner event source name, which is
+            # also the bus name, as their source, so it is matched exactly
+            # instead of by prefix.
             event_pattern={
-                "source": [{"prefix": "aws.partner/stripe.com"}],
                 "detail-type": [
                     "customer.subscription.created",
                     "customer.subscription.updated",
                     "customer.subscription.deleted",
                     "customer.subscription.paused",
                     "customer.subscription.resumed"
-                ]
+                ],
+                "source": [event_bus_name]
             },
             description="Rule to capture Stripe subscription events from EventBridge Partner Event Source",
             event_bus_name=stripe_event_bus.event_bus_name,
-            role_arn=eventbridge_role.role_arn,
             targets=[
                 events.CfnRule.TargetProperty(
-                    id="StripeSubsStepFunctionTarget",
-                    arn=state_machine.state_machine_arn,
-                    role_arn=eventbridge_role.role_arn
+                    id="StripeSubsEventsQueueTarget",
+                    arn=subscription_events_queue.queue_arn,
+                    # Only forward the fields read by the event handler
+                    input_transformer=events.CfnRule.InputTransformerProperty(
+                        input_paths_map={
+                            "detailType": "$.detail-type",
+                            "detail": "$.detail"
+                        },
+                        input_template='{"detail-type": <detailType>, "detail": <detail>}'
+                    )
                 )
             ]
+        )
+
+        # Allow the rule to send events to the queue
+        subscription_events_queue_policy = sqs.QueuePolicy(
+            self,
+            "StripeSubsEventsQueuePolicy",
+            queues=[subscription_events_queue],
+        )
+        subscription_events_queue_policy.document.add_statements(
+            iam.PolicyStatement(
+                actions=["sqs:SendMessage"],
+                principals=[iam.ServicePrincipal("events.amazonaws.com")],
+                resources=[subscription_events_queue.queue_arn],
+                conditions={
+                    "ArnEquals": {"aws:SourceArn": stripe_subs_events_rule.attr_arn}
+                },
+            )
         )
\ No newline at end of file
@@ -1,21 +1,68 @@
-import json
 import os
 import logging
 import boto3
 import stripe
+from botocore.config import Config
 from botocore.exceptions import ClientError
-from stripe.error import StripeError, InvalidRequestError
+from stripe import StripeError, InvalidRequestError, AuthenticationError, StripeObject
 from datetime import datetime
 import datetime as dt 
 import time, random
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+def _json_default(obj):
+    """Serialize StripeObjects, which are no longer dicts as of stripe 15."""
+    if isinstance(obj, StripeObject):
+        return obj.to_dict()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+# Prefer orjson from the layer for (de)serialization, fall back to the stdlib
+try:
+    import orjson
+
+    def json_dumps(obj) -> str:
+        return orjson.dumps(obj, default=_json_default).decode()
+
+    json_loads = orjson.loads
+except ImportError:
+    import json
+
+    json_dumps = partial(json.dumps, default=_json_default)
+    json_loads = json.loads
 
 # Initialize logging
 logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+
+_UTC = dt.UTC
 
 # Initialize clients
-dynamodb = boto3.resource('dynamodb')
-ssm_client = boto3.client('ssm')
+# Keep connections alive across warm invocations and let botocore's adaptive
+# retry mode back off when DynamoDB throttles
+dynamodb_client = boto3.client(
+    'dynamodb',
+    config=Config(
+        tcp_keepalive=True,
+        max_pool_connections=10,
+        retries={'mode': 'adaptive', 'max_attempts': 5}
+    )
+)
+secrets_client = boto3.client('secretsmanager')
+
+# Thread pool used to run blocking Stripe calls concurrently, sized for one
+# request per record of a full SQS batch
+executor = ThreadPoolExecutor(max_workers=25)
+
+# The table name is resolved at synth time and passed in directly
+TABLE_NAME = os.environ['SUBSCRIBERS_TABLE_NAME']
+
+# Values cached across warm invocations of the same container
+_STRIPE_KEY_LOADED = False
+
+# Maximum number of put requests accepted by a single BatchWriteItem call
+BATCH_WRITE_MAX_ITEMS = 25
 
 def get_secret(secret_name) -> dict:
     """Fetch the service account private key from AWS Secrets Manager.
@@ -26,219 +73,411 @@ def get_secret(secret_name) -> dict:
     Returns:
         dict: The secret object
     """
-    secrets_client = boto3.client('secretsmanager')
     try:
         response = secrets_client.get_secret_value(SecretId=secret_name)
-        return json.loads(response['SecretString'])
+        return json_loads(response['SecretString'])
     except Exception as e:
         print(f"Error fetching secret {secret_name}: {str(e)}")
         raise
 
-def get_table_name_from_ssm(ssm_parameter_name) -> str:
-    """Retrieve the DynamoDB table name from SSM Parameter Store.
-    
-    Args:
-        ssm_parameter_name (str): The name of the SSM parameter to fetch
-
-    Returns:
-        str: The DynamoDB table name
-    """
-    try:
-        response = ssm_client.get_parameter(Name=ssm_parameter_name, WithDecryption=True)
-        return response['Parameter']['Value']
-    except Exception as e:
-        print(f"Error fetching SSM parameter {ssm_parameter_name}: {str(e)}")
-        raise
-
-def retrieve_subscription(subscription_id):
-    """
-    Retrieves the subscription details from Stripe.
+def to_attribute_value(value) -> dict:
+    """Convert a Python value into a DynamoDB AttributeValue.
 
     Args:
-        subscription_id (str): The ID of the subscription.
+        value: A None, bool, number, string, dict, list or StripeObject value
 
     Returns:
-        stripe.Subscription: The subscription object.
-
-    Raises:
-        stripe.error.StripeError: If retrieval fails.
+        dict: The typed AttributeValue, e.g. {'S': 'foo'} or {'N': '42'}
     """
-    try:
-        subscription = stripe.Subscription.retrieve(subscription_id)
-        logger.info(f"Retrieved subscription: {subscription_id}")
-        return subscription
-    except StripeError as e:
-        logger.error(f"Stripe error retrieving subscription {subscription_id}: {e}")
-        raise
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, (int, float)):
+        return {'N': str(value)}
+    if isinstance(value, str):
+        return {'S': value}
+    if isinstance(value, dict):
+        return {'M': {k: to_attribute_value(v) for k, v in value.items()}}
+    if isinstance(value, StripeObject):
+        # StripeObject is no longer a dict subclass as of stripe 15
+        return to_attribute_value(value.to_dict())
+    if isinstance(value, (list, tuple)):
+        return {'L': [to_attribute_value(v) for v in value]}
+    raise TypeError(f"Unsupported type for DynamoDB attribute: {type(value).__name__}")
 
-def retrieve_customer(customer_id):
+async def retrieve_subscription(subscription_id):
     """
-    Retrieves the customer details from Stripe with exponential backoff.
+    Retrieves the subscription details from Stripe, with the customer expanded
+    inline, using exponential backoff.
+
+    The blocking Stripe call runs on the module thread pool and the backoff
+    awaits, so other records of the batch proceed while this one waits.
 
     Args:
-        customer_id (str): The ID of the customer.
+        subscription_id (str): The ID of the subscription.
 
     Returns:
-        stripe.Customer: The customer object.
+        stripe.Subscription: The subscription object. Its 'customer' field
+        holds the full stripe.Customer object instead of the customer ID.
 
     Raises:
-        Exception: If the customer cannot be retrieved after retries.
+        Exception: If the subscription cannot be retrieved after retries.
     """
     max_retries = 5
     base_delay = 5  # in seconds
+    loop = asyncio.get_running_loop()
 
     for attempt in range(1, max_retries + 1):
         try:
-            customer = stripe.Customer.retrieve(customer_id)
-            logger.info(f"Retrieved customer: {customer_id}")
-            return customer
+            subscription = await loop.run_in_executor(
+                executor, partial(stripe.Subscription.retrieve, subscription_id, expand=['customer'])
+            )
+            logger.info(f"Retrieved subscription: {subscription_id}")
+            return subscription
         except InvalidRequestError as e:
             if e.code == 'resource_missing':
-                logger.warning(f"Customer {customer_id} not found. Attempt {attempt} of {max_retries}. Retrying...")
+                logger.warning(f"Subscription {subscription_id} or its customer not found. Attempt {attempt} of {max_retries}. Retrying...")
                 if attempt == max_retries:
-                    logger.error(f"Max retries reached. Customer {customer_id} still not found.")
-                    raise Exception(f"Customer {customer_id} not found after {max_retries} attempts.")
+                    logger.error(f"Max retries reached. Subscription {subscription_id} still not found.")
+                    raise Exception(f"Subscription {subscription_id} not found after {max_retries} attempts.")
                 else:
                     # Exponential backoff with jitter
                     delay = base_delay * (2 ** (attempt - 1))
                     jitter = random.uniform(0, 0.1 * delay)  # Adding jitter up to 10% of the delay
                     sleep_time = delay + jitter
                     logger.warning(f"Sleeping for {sleep_time:.2f} seconds before retrying...")
-                    time.sleep(sleep_time)
+                    await asyncio.sleep(sleep_time)
             else:
-                logger.error(f"Stripe InvalidRequestError retrieving customer {customer_id}: {e}")
+                logger.error(f"Stripe InvalidRequestError retrieving subscription {subscription_id}: {e}")
                 raise
         except StripeError as e:
-            logger.error(f"Stripe error retrieving customer {customer_id}: {e}")
+            logger.error(f"Stripe error retrieving subscription {subscription_id}: {e}")
             raise
         except Exception as e:
-            logger.error(f"Unexpected error retrieving customer {customer_id}: {e}")
+            logger.error(f"Unexpected error retrieving subscription {subscription_id}: {e}")
             raise
 
+def load_configuration() -> None:
+    """Resolve the Stripe API key from Secrets Manager.
+
+    The key is kept for the lifetime of the execution environment, until
+    Stripe rejects it (e.g. after a key rotation).
+    """
+    global _STRIPE_KEY_LOADED
+    secret = get_secret(os.environ.get('STRIPE_API_KEY_SECRET_NAME', 'stripe/api/sandbox/api_key'))
+    stripe_api_key = secret.get('api_key')
+    if not stripe_api_key:
+        logger.error("API key not found in the secret.")
+        return
+    stripe.api_key = stripe_api_key
+    _STRIPE_KEY_LOADED = True
+    logger.info("Stripe API key initialized.")
+
+# Load configuration during the init phase so it is captured in the SnapStart
+# snapshot; failures are retried on the first invocation
+try:
+    load_configuration()
+except Exception as e:
+    logger.warning(f"Deferring configuration loading to the first invocation: {e}")
+
+async def prepare_record(record) -> tuple:
+    """Build the subscriber item for one SQS record carrying a Stripe event.
+
+    Args:
+        record (dict): The SQS record; its body is the parsed Stripe event
+            with 'detail-type' and 'detail' keys.
+
+    Returns:
+        tuple: The event type and the subscriber item.
+
+    Raises:
+        Exception: If the subscription or customer cannot be resolved.
+    """
+    event = json_loads(record['body'])
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Received event: %s", json_dumps(event))
+
+    subscription_id = event['detail']['data']['object']['id']
+    subscription = await retrieve_subscription(subscription_id)
+    # Stripe objects are read by attribute; getattr() with a default covers
+    # optional fields, since StripeObject is not a dict on every stripe release
+    customer = getattr(subscription, 'customer', None)
+    event_type = event.get('detail-type')
+    if not customer or not event_type:
+        logger.error("Missing 'customer' or 'event_type' in the event.")
+        raise Exception("Missing 'customer' or 'event_type' in the event.")
+    subscription_id = subscription.id
+    customer_id = customer.id
+    customer_email = getattr(customer, 'email', None)
+    if not customer_email:
+        # The email is the table's partition key, so the item cannot be written
+        logger.error(f"No email found for customer {customer_id} of subscription {subscription_id}.")
+        raise Exception(f"No email found for customer {customer_id} of subscription {subscription_id}.")
+    status = getattr(subscription, 'status', None)
+    start_date = getattr(subscription, 'start_date', None)
+    end_date = getattr(subscription, 'canceled_at', None)  # Use appropriate field based on event
+    plan = getattr(subscription, 'plan', None)
+    plan_id = getattr(plan, 'id', None)
+    amount = getattr(plan, 'amount', None)
+    timestamp = datetime.now(_UTC).strftime('%Y-%m-%dT%H:%M:%SZ')
+    date_str = timestamp[:10]
+    item = {
+        'email': customer_email,
+        'subscription_id': subscription_id,
+        'customer_id': customer_id,
+        'full_name': getattr(customer, 'name', None),
+        'subscriber_info': getattr(customer, 'address', None),
+        'status': status,
+        'start_date': start_date,
+        'end_date': end_date,
+        'plan_id': plan_id,
+        'amount': amount,
+        'last_updated': date_str,
+        'subscription_date': date_str,
+        'signup_timestamp': timestamp
+    }
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Prepared item for DynamoDB: %s", json_dumps(item))
+    return event_type, item
+
+async def prepare_records(records) -> list:
+    """Build the subscriber items for all records of a batch concurrently.
+
+    Args:
+        records (list): The SQS records.
+
+    Returns:
+        list: One (event_type, item) tuple or raised exception per record,
+        in the order of the records.
+    """
+    return await asyncio.gather(
+        *(prepare_record(record) for record in records),
+        return_exceptions=True
+    )
+
+def update_subscription(table_name, email, fields) -> None:
+    """Set the given attributes on a subscriber item with a single UpdateItem.
+
+    Args:
+        table_name (str): The DynamoDB table name.
+        email (str): The subscriber email (partition key).
+        fields (dict): The attributes to set.
+    """
+    # Attribute names are aliased since e.g. 'status' is a reserved word
+    dynamodb_client.update_item(
+        TableName=table_name,
+        Key={
+            'email': {'S': email}
+        },
+        UpdateExpression="SET " + ", ".join(f"#{k} = :{k}" for k in fields),
+        ExpressionAttributeNames={f"#{k}": k for k in fields},
+        ExpressionAttributeValues={f":{k}": to_attribute_value(v) for k, v in fields.items()}
+    )
+
+def _apply_status_update(item, fields, pending_items) -> None:
+    """Fold a status change into the pending write for the same subscriber,
+    or apply it right away with UpdateItem.
+
+    Args:
+        item (dict): The subscriber item built from the event.
+        fields (dict): The attributes to set.
+        pending_items (dict): The items awaiting BatchWriteItem, by email.
+    """
+    email = item['email']
+    if email in pending_items:
+        pending_items[email].update(fields)
+    else:
+        update_subscription(TABLE_NAME, email, fields)
+
+def _op_put(item, pending_items) -> str:
+    """Queue the full subscriber item for BatchWriteItem."""
+    pending_items[item['email']] = item
+    return 'inserted/updated'
+
+def _op_cancel(item, pending_items) -> str:
+    """Mark the subscription as canceled and set end_date."""
+    fields = {
+        'status': 'canceled',
+        'end_date': item['end_date'],
+        'last_updated': item['last_updated']
+    }
+    _apply_status_update(item, fields, pending_items)
+    return 'canceled'
+
+def _op_pause(item, pending_items) -> str:
+    """Mark the subscription as paused."""
+    fields = {
+        'status': 'paused',
+        'last_updated': item['last_updated']
+    }
+    _apply_status_update(item, fields, pending_items)
+    return 'paused'
+
+# DynamoDB operation for each handled Stripe event type
+_DISPATCH = {
+    'customer.subscription.created': _op_put,
+    'customer.subscription.updated': _op_put,
+    'customer.subscription.resumed': _op_put,
+    'customer.subscription.deleted': _op_cancel,
+    'customer.subscription.paused': _op_pause,
+}
+
+def _put_items_individually(table_name, put_requests) -> list:
+    """Write put requests one by one with PutItem.
+
+    Used when BatchWriteItem rejects a whole chunk, so that only the invalid
+    items (e.g. larger than 400 KB) fail.
+
+    Args:
+        table_name (str): The DynamoDB table name.
+        put_requests (list): The BatchWriteItem put requests.
+
+    Returns:
+        list: The emails of the items that could not be written.
+    """
+    failed_emails = []
+    for request in put_requests:
+        item = request['PutRequest']['Item']
+        email = item['email']['S']
+        try:
+            dynamodb_client.put_item(TableName=table_name, Item=item)
+        except ClientError as e:
+            logger.error(f"DynamoDB ClientError writing subscriber {email}: {e.response['Error']['Message']}")
+            failed_emails.append(email)
+    return failed_emails
+
+def batch_put_items(table_name, items) -> list:
+    """Write subscriber items with BatchWriteItem, in chunks of 25.
+
+    Unprocessed items are retried with exponential backoff. If DynamoDB
+    rejects a chunk as invalid, its items are retried one by one so that
+    only the offending items fail.
+
+    Args:
+        table_name (str): The DynamoDB table name.
+        items (list): The subscriber items, at most one per email.
+
+    Returns:
+        list: The emails of the items that could not be written.
+    """
+    max_retries = 5
+    base_delay = 0.1  # in seconds
+    failed_emails = []
+
+    for start in range(0, len(items), BATCH_WRITE_MAX_ITEMS):
+        put_requests = []
+        for item in items[start:start + BATCH_WRITE_MAX_ITEMS]:
+            try:
+                put_requests.append(
+                    {'PutRequest': {'Item': {k: to_attribute_value(v) for k, v in item.items()}}}
+                )
+            except TypeError as e:
+                logger.error(f"Cannot marshal item for subscriber {item['email']}: {e}")
+                failed_emails.append(item['email'])
+        if not put_requests:
+            continue
+
+        try:
+            for attempt in range(1, max_retries + 1):
+                response = dynamodb_client.batch_write_item(RequestItems={table_name: put_requests})
+                put_requests = response.get('UnprocessedItems', {}).get(table_name, [])
+                if not put_requests or attempt == max_retries:
+                    break
+                # Exponential backoff with jitter
+                delay = base_delay * (2 ** (attempt - 1))
+                jitter = random.uniform(0, 0.1 * delay)  # Adding jitter up to 10% of the delay
+                logger.warning(f"{len(put_requests)} item(s) unprocessed. Attempt {attempt} of {max_retries}. Retrying...")
+                time.sleep(delay + jitter)
+        except ClientError as e:
+            logger.error(f"DynamoDB ClientError: {e.response['Error']['Message']}")
+            if e.response['Error']['Code'] == 'ValidationException':
+                failed_emails.extend(_put_items_individually(table_name, put_requests))
+                continue
+        if put_requests:
+            failed_emails.extend(request['PutRequest']['Item']['email']['S'] for request in put_requests)
+
+    if failed_emails:
+        logger.error(f"Failed to write {len(failed_emails)} item(s) with BatchWriteItem.")
+    return failed_emails
+
 def lambda_handler(event, context):
     """
     AWS Lambda handler to manage subscription data in DynamoDB.
-    
+
+    Processes a batch of SQS records. The Stripe lookups for all records run
+    concurrently, then full-item writes are collected per subscriber email
+    and flushed with BatchWriteItem; status-only changes are folded into a
+    pending write for the same subscriber or applied with UpdateItem.
+
     Args:
-        event (dict): The input event from Step Functions containing subscription data.
+        event (dict): The SQS event containing Stripe subscription events.
         context (object): The Lambda context object.
-    
+
     Returns:
-        dict: Confirmation message or the updated item.
-    
+        dict: The SQS batch response listing the records that failed.
+
     Raises:
-        Exception: If any step in the process fails.
+        Exception: If the Stripe API key cannot be loaded.
     """
-    try:
-        table_name = get_table_name_from_ssm(os.environ['SUBSCRIBERS_TABLE_NAME_PARAM'])
-        table = dynamodb.Table(table_name)
-        logger.info(f"Received event: {json.dumps(event)}")
-
-        secret = get_secret(os.environ.get('STRIPE_API_KEY_SECRET_NAME', 'stripe/api/sandbox/api_key'))
-        stripe_api_key = secret.get('api_key')
-        if not stripe_api_key:
-            logger.error("API key not found in the secret.")
-            return {"status": "error", "message": "API key not found."}
-        stripe.api_key = stripe_api_key
-        logger.info("Stripe API key initialized.")
-        subscription_id = event['Payload']['detail']['data']['object']['id']
-        subscription = retrieve_subscription(subscription_id)
-        customer_id = subscription.get('customer')
-        if not customer_id:
-            logger.error(f"No customer ID found in subscription {subscription_id}.")
-            return {"status": "error", "message": "No customer ID found in subscription."}
-        customer = retrieve_customer(customer_id)
-        event_type = event['Payload']['detail-type']
-        if not subscription or not customer or not event_type:
-            logger.error("Missing 'subscription', 'customer', or 'event_type' in the event.")
-            raise Exception("Missing 'subscription', 'customer', or 'event_type' in the event.")
-        subscription_id = subscription.get('id')
-        customer_id = customer.get('id')
-        customer_email = customer.get('email')
-        status = subscription.get('status')
-        start_date = subscription.get('start_date')
-        end_date = subscription.get('canceled_at')  # Use appropriate field based on event
-        plan_id = subscription.get('plan', {}).get('id') if subscription.get('plan') else None
-        amount = subscription.get('plan', {}).get('amount') if subscription.get('plan') else None
-        item = {
-            'email': customer_email,
-            'subscription_id': subscription_id,
-            'customer_id': customer_id,
-            'full_name': customer.name,
-            'subscriber_info': customer.address,
-            'status': status,
-            'start_date': start_date,
-            'end_date': end_date,
-            'plan_id': plan_id,
-            'amount': amount,
-            'last_updated': datetime.now(dt.UTC).strftime('%Y-%m-%d'),
-            'subscription_date': datetime.now(dt.UTC).strftime('%Y-%m-%d'),
-            'signup_timestamp': datetime.now(dt.UTC).strftime('%Y-%m-%dT%H:%M:%SZ')
-        }
-
-        logger.info(f"Prepared item for DynamoDB: {json.dumps(item)}")
-
-        # Depending on the event type, decide the operation
-        if event_type in ['customer.subscription.created', 'customer.subscription.resumed', 'customer.subscription.updated']:
-            # Use put_item to insert or update
-            response = table.put_item(
-                Item=item
-            )
-            operation = 'inserted/updated'
-        elif event_type == 'customer.subscription.deleted':
-            # Optionally, you can delete the item or mark it as canceled
-            # Here, we'll update the status to 'canceled' and set end_date
-            response = table.update_item(
-                Key={
-                   'email': customer_email
-                },
-                UpdateExpression="SET #st = :status, end_date = :end_date, last_updated = :last_updated",
-                ExpressionAttributeNames={
-                    "#st": "status"
-                },
-                ExpressionAttributeValues={
-                    ':status': 'canceled',
-                    ':end_date': end_date,
-                    ':last_updated': item['last_updated']
-                },
-                ReturnValues="UPDATED_NEW"
-            )
-            operation = 'canceled'
-        elif event_type == 'customer.subscription.paused':
-            # Update the status to 'paused'
-            response = table.update_item(
-                Key={
-                    'email': customer_email
-                },
-                UpdateExpression="SET #st = :status, last_updated = :last_updated",
-                ExpressionAttributeNames={
-                    "#st": "status"
-                },
-                ExpressionAttributeValues={
-                    ':status': 'paused',
-                    ':last_updated': item['last_updated']
-                },
-                ReturnValues="UPDATED_NEW"
-            )
-            operation = 'paused'
-        else:
-            logger.warning(f"Unhandled event type: {event_type}. No operation performed.")
-            raise Exception(f"Unhandled event type: {event_type}")
-
-        logger.info(f"DynamoDB operation '{operation}' completed successfully for subscription_id: {subscription_id}")
-
-        # Optionally, return the operation and item details
-        return {
-            'message': f"Subscription {subscription_id} {operation} successfully.",
-            'subscription_id': subscription_id,
-            'customer_id': customer_id,
-            'operation': operation,
-            'updated_fields': response.get('Attributes', {})
-        }
-
-    except ClientError as e:
-        logger.error(f"DynamoDB ClientError: {e.response['Error']['Message']}")
-        raise Exception(f"DynamoDB ClientError: {e.response['Error']['Message']}")
-    except Exception as e:
-        logger.error(f"Error processing DynamoDB operation: {str(e)}")
-        raise Exception(f"Error processing DynamoDB operation: {str(e)}")
\ No newline at end of file
+    global _STRIPE_KEY_LOADED
+    if not _STRIPE_KEY_LOADED:
+        load_configuration()
+    if not _STRIPE_KEY_LOADED:
+        # Fail the whole batch so the messages are retried
+        raise Exception("API key not found.")
+
+    pending_items = {}
+    pending_message_ids = {}
+    batch_item_failures = []
+
+    records = event['Records']
+    prepared = asyncio.run(prepare_records(records))
+
+    # The key loaded at init, and captured in the SnapStart snapshot, may
+    # have been rotated since; reload it and retry the rejected records once
+    rejected = [i for i, result in enumerate(prepared) if isinstance(result, AuthenticationError)]
+    if rejected:
+        logger.warning("Stripe rejected the API key. Reloading it from Secrets Manager...")
+        _STRIPE_KEY_LOADED = False
+        load_configuration()
+        retried = asyncio.run(prepare_records([records[i] for i in rejected]))
+        for i, result in zip(rejected, retried):
+            prepared[i] = result
+
+    for record, result in zip(records, prepared):
+        message_id = record['messageId']
+        try:
+            if isinstance(result, Exception):
+                raise result
+            event_type, item = result
+            operation_fn = _DISPATCH.get(event_type)
+            if operation_fn is None:
+                logger.warning(f"Unhandled event type: {event_type}. No operation performed.")
+                raise Exception(f"Unhandled event type: {event_type}")
+
+            # prepare_record guarantees a non-empty email, so the pending
+            # writes are never keyed on None
+            operation = operation_fn(item, pending_items)
+            email = item['email']
+            if email in pending_items:
+                # The message succeeds or fails with the pending write
+                pending_message_ids.setdefault(email, []).append(message_id)
+            else:
+                logger.info(f"DynamoDB operation '{operation}' completed successfully for subscription_id: {item['subscription_id']}")
+        except ClientError as e:
+            logger.error(f"DynamoDB ClientError for message {message_id}: {e.response['Error']['Message']}")
+            batch_item_failures.append({'itemIdentifier': message_id})
+        except Exception as e:
+            logger.error(f"Error processing message {message_id}: {str(e)}")
+            batch_item_failures.append({'itemIdentifier': message_id})
+
+    failed_emails = batch_put_items(TABLE_NAME, list(pending_items.values()))
+    for email in failed_emails:
+        batch_item_failures.extend(
+            {'itemIdentifier': message_id} for message_id in pending_message_ids[email]
+        )
+    logger.info(f"DynamoDB batch write completed for {len(pending_items) - len(failed_emails)} subscriber(s).")
+
+    return {'batchItemFailures': batch_item_failures}
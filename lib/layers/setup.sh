@@ -1,10 +1,37 @@
 #!/bin/bash
 
+SITE_PACKAGES=layer/python/lib/python3.12/site-packages
+
 for case in stripe
 do
     rm ${case}_layer.zip 
-    mkdir -p layer/python/lib/python3.11/site-packages/
-    python3.11 -m pip install -r ${case}_requirements.txt -t layer/python/lib/python3.11/site-packages/
+    mkdir -p ${SITE_PACKAGES}/
+    # Install Linux arm64 wheels to match the Graviton Lambda architecture
+    python3.12 -m pip install -r ${case}_requirements.txt -t ${SITE_PACKAGES}/ \
+        --platform manylinux2014_aarch64 \
+        --implementation cp \
+        --python-version 3.12 \
+        --only-binary=:all:
+    # Strip files that are never imported at runtime to keep the layer small:
+    # console scripts, bytecode caches and stripe's deprecated api_resources
+    # shims (only loaded lazily when stripe.api_resources is accessed)
+    rm -rf ${SITE_PACKAGES}/bin
+    rm -rf ${SITE_PACKAGES}/stripe/api_resources
+    find ${SITE_PACKAGES} -type d -name __pycache__ -prune -exec rm -rf {} +
+    # Tree-shake stripe down to the core resources used by the handler
+    # (Subscription, Customer and the error types). stripe resolves these
+    # namespaces lazily, on attribute access or when an API response contains
+    # an object of one of their types (e.g. {"object": "checkout.session"}).
+    # A response carrying an object from a removed namespace therefore fails
+    # with ModuleNotFoundError, so billing and test_helpers (test clocks),
+    # which subscriptions can reference, are kept; stripe/params only holds
+    # typing-only request params
+    for namespace in apps billing_portal checkout climate entitlements \
+        financial_connections forwarding identity issuing params product_catalog \
+        radar reporting reserve sigma tax terminal three_d_secure treasury
+    do
+        rm -rf ${SITE_PACKAGES}/stripe/${namespace}
+    done
     pushd layer
         zip -r9 ../${case}_layer.zip .
     popd
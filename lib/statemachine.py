@@ -1,9 +1,11 @@
 from aws_cdk import (
     aws_lambda as _lambda,
+    aws_lambda_event_sources as lambda_event_sources,
+    aws_sqs as sqs,
     aws_secretsmanager as secretsmanager,
     aws_iam as iam,
-    aws_stepfunctions as sfn,
-    aws_stepfunctions_tasks as tasks,
+    aws_cloudwatch as cloudwatch,
+    CfnOutput,
     Duration,
     Stack,
 )
@@ -19,58 +21,99 @@ class EventStateMachineStack(Stack):
             **kwargs
         ) -> None:
         super().__init__(scope, id, **kwargs)
-        env = kwargs['env']
-        account = env.account
-        region = env.region
        
         # Define the Stripe Lambda Layer
         stripe_layer = _lambda.LayerVersion(
             self,
             "StripeLayer",
             code=_lambda.Code.from_asset("lib/layers/stripe_layer.zip"),
-            compatible_runtimes=[_lambda.Runtime.PYTHON_3_11],
+            compatible_runtimes=[_lambda.Runtime.PYTHON_3_12],
+            compatible_architectures=[_lambda.Architecture.ARM_64],
             description="A layer with the Stripe library",
         )
 
         # Define the Stripe Event Handler Lambda Function
         stripe_event_handler = _lambda.Function(
             self, "StripeSubsEventHandler",
-            runtime=_lambda.Runtime.PYTHON_3_11,
+            runtime=_lambda.Runtime.PYTHON_3_12,
+            architecture=_lambda.Architecture.ARM_64,
             handler="dynamo_put.lambda_handler",
             code=_lambda.Code.from_asset("lib/lambda"),
             layers=[stripe_layer],
             timeout=Duration.seconds(120),
+            memory_size=1769,  # one full vCPU for the CPU-bound stripe/boto3 imports
+            snap_start=_lambda.SnapStartConf.ON_PUBLISHED_VERSIONS,
             environment={
-                'SUBSCRIBERS_TABLE_NAME_PARAM': config['dynamo']['stripe_ssm_param_name'],
-                'STRIPE_API_KEY_SECRET_NAME': config['secrets']['stripe_api_key_secret_name'] 
+                'SUBSCRIBERS_TABLE_NAME': config['dynamo']['stripe_subscribers_table_name'],
+                'STRIPE_API_KEY_SECRET_NAME': config['secrets']['stripe_api_key_secret_name'],
+                # Set to DEBUG to log the received events and prepared items
+                'LOG_LEVEL': 'INFO'
             }
         )
-        # Grant permissions to the Lambda function for DynamoDB read/write
-        stripe_event_handler.add_to_role_policy(
-            iam.PolicyStatement(
-                actions=["ssm:GetParameter"],
-                resources=[
-                    f"arn:aws:ssm:{region}:{account}:parameter{config['dynamo']['stripe_ssm_param_name']}",
-                ],
-            )
+
+        # SnapStart only applies to published versions, so invoke the handler
+        # through an alias pointing at the latest published version
+        stripe_event_handler_alias = _lambda.Alias(
+            self, "StripeSubsEventHandlerAlias",
+            alias_name="live",
+            version=stripe_event_handler.current_version,
         )
 
-        # Define the Parse Event Lambda Function
-        parse_event_handler = _lambda.Function(
-            self, "StripeParseEventHandler",
-            runtime=_lambda.Runtime.PYTHON_3_11,
-            handler="parse_event.lambda_handler",
-            code=_lambda.Code.from_asset("lib/lambda"),
-            layers=[stripe_layer],
-            timeout=Duration.seconds(120),
-            environment={
-                'STRIPE_API_KEY_SECRET_NAME': config['secrets']['stripe_api_key_secret_name'] 
-            }
+        # Define the queue that batches subscription events for the handler
+        subscription_events_dlq = sqs.Queue(
+            self,
+            "StripeSubsEventsDLQ",
+            retention_period=Duration.days(14),
+        )
+        subscription_events_queue = sqs.Queue(
+            self,
+            "StripeSubsEventsQueue",
+            # At least six times the function timeout, as recommended for SQS event sources
+            visibility_timeout=Duration.seconds(6 * 120),
+            dead_letter_queue=sqs.DeadLetterQueue(
+                max_receive_count=5,
+                queue=subscription_events_dlq,
+            ),
+        )
+
+        # Alarm as soon as a message lands in the dead-letter queue, so that
+        # subscriber writes that keep failing do not go unnoticed
+        self.dead_letter_queue_alarm = cloudwatch.Alarm(
+            self,
+            "StripeSubsEventsDLQAlarm",
+            metric=subscription_events_dlq.metric_approximate_number_of_messages_visible(
+                period=Duration.minutes(5),
+                statistic="Maximum",
+            ),
+            threshold=0,
+            comparison_operator=cloudwatch.ComparisonOperator.GREATER_THAN_THRESHOLD,
+            evaluation_periods=1,
+            treat_missing_data=cloudwatch.TreatMissingData.NOT_BREACHING,
+            alarm_description="Stripe subscription events failed repeatedly and were moved to the dead-letter queue",
         )
-        
+
+        # Expose the dead-letter queue ARN for redriving failed events
+        CfnOutput(
+            self,
+            "StripeSubsEventsDLQArn",
+            value=subscription_events_dlq.queue_arn,
+            description="Dead-letter queue of the Stripe subscription events",
+        )
+
+        # Deliver events to the handler in batches of up to 25 records, the
+        # maximum accepted by a single DynamoDB BatchWriteItem call
+        stripe_event_handler_alias.add_event_source(
+            lambda_event_sources.SqsEventSource(
+                subscription_events_queue,
+                batch_size=25,
+                max_batching_window=Duration.seconds(10),
+                report_batch_item_failures=True,
+            )
+        )
+
         # Grant Secrets Manager Access to Lambda Function
         secret_names = [config['secrets']['stripe_api_key_secret_name']]
-        functions = [stripe_event_handler, parse_event_handler]
+        functions = [stripe_event_handler]
         # Grant read access to the secret for each function
         for secret_name in secret_names:
             secret = secretsmanager.Secret.from_secret_name_v2(
@@ -87,95 +130,11 @@ class EventStateMachineStack(Stack):
                     )
                 )
 
-        # Define the Step Functions Task to Invoke the Stripe Event Handler Lambda Function
-        parse_event_task = tasks.LambdaInvoke(
-            self,
-            "ParseStripeEvent",
-            lambda_function=parse_event_handler,
-            result_path="$.ParseResult"
-        )
-
-        # Define the Choice State based on the subscription event type
-        choice_state = sfn.Choice(
-            self,
-            "ChooseSubscriptionEventType"
-        )
-
-        # Define tasks for each subscription event type
-        subscription_created_task = tasks.LambdaInvoke(
-            self,
-            "HandleSubscriptionCreated",
-            lambda_function=stripe_event_handler,
-            input_path="$.ParseResult",
-        )
-
-        subscription_updated_task = tasks.LambdaInvoke(
-            self,
-            "HandleSubscriptionUpdated",
-            lambda_function=stripe_event_handler,
-            input_path="$.ParseResult",
-        )
-
-        subscription_deleted_task = tasks.LambdaInvoke(
-            self,
-            "HandleSubscriptionDeleted",
-            lambda_function=stripe_event_handler,
-            input_path="$.ParseResult",
-        )
-
-        subscription_paused_task = tasks.LambdaInvoke(
-            self,
-            "HandleSubscriptionPaused",
-            lambda_function=stripe_event_handler,
-            input_path="$.ParseResult",
-        )
-
-        subscription_resumed_task = tasks.LambdaInvoke(
-            self,
-            "HandleSubscriptionResumed",
-            lambda_function=stripe_event_handler,
-            input_path="$.ParseResult",
-        )
-
-        # Define the Workflow with Conditional Branching and Error Handling
-        definition = parse_event_task.next(
-            choice_state
-                .when(
-                    sfn.Condition.string_equals("$.detail-type", "customer.subscription.created"),
-                    subscription_created_task
-                )
-                .when(
-                    sfn.Condition.string_equals("$.detail-type", "customer.subscription.updated"),
-                    subscription_updated_task
-                )
-                .when(
-                    sfn.Condition.string_equals("$.detail-type", "customer.subscription.deleted"),
-                    subscription_deleted_task
-                )
-                .when(
-                    sfn.Condition.string_equals("$.detail-type", "customer.subscription.paused"),
-                    subscription_paused_task
-                )
-                .when(
-                    sfn.Condition.string_equals("$.detail-type", "customer.subscription.resumed"),
-                    subscription_resumed_task
-                )
-                .otherwise(
-                    sfn.Pass(self, "IgnoreUnknownEvent") # Ignore unknown event types
-                )
-        )
-
-        # Define the Step Functions State Machine using `definition_body`
-        self.state_machine = sfn.StateMachine(
-            self,
-            "StripeEventStateMachine",
-            definition_body=sfn.DefinitionBody.from_chainable(definition),
-            timeout=Duration.minutes(5),
-            tracing_enabled=True
-        )
+        # Queue targeted by the EventBridge rule, and its dead-letter queue
+        self.subscription_events_queue = subscription_events_queue
+        self.subscription_events_dlq = subscription_events_dlq
 
-        # Lambda functions for the state machine
+        # Lambda functions of the event handling pipeline
         self.lambda_functions = {
-            "StripeEventHandler": stripe_event_handler,
-            "ParseEventHandler": parse_event_handler
+            "StripeEventHandler": stripe_event_handler
         }
\ No newline at end of file